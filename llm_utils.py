@@ -1,9 +1,11 @@
+import functools
 import os
 from typing import List, Dict, Optional
 
 from dotenv import load_dotenv
 from openai import OpenAI
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
 
 
@@ -15,6 +17,7 @@ SYSTEM_PROMPT = (
 )
 
 
+@functools.lru_cache(maxsize=1)
 def get_openai_client() -> OpenAI:
     load_dotenv()
     api_key = os.getenv("OPENAI_API_KEY")
@@ -34,44 +37,99 @@ def call_llm(messages: List[Dict[str, str]], model: str = "gpt-4o-mini") -> str:
     return resp.choices[0].message.content or ""
 
 
-def _tool_specs():
-    return [
-        {
-            "type": "function",
-            "function": {
-                "name": "search_tracks",
-                "description": "Fuzzy search the local CSV to resolve user-provided song text to track IDs.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query": {"type": "string", "description": "The user-provided song(s) and optional artists."},
-                        "limit": {"type": "integer", "default": 5, "minimum": 1, "maximum": 20},
-                        "score_cutoff": {"type": "integer", "default": 70, "minimum": 0, "maximum": 100},
-                    },
-                    "required": ["query"],
+_TOOL_SPECS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "search_tracks",
+            "description": "Fuzzy search the local CSV to resolve user-provided song text to track IDs.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "The user-provided song(s) and optional artists."},
+                    "limit": {"type": "integer", "default": 5, "minimum": 1, "maximum": 20},
+                    "score_cutoff": {"type": "integer", "default": 70, "minimum": 0, "maximum": 100},
                 },
+                "required": ["query"],
             },
         },
-        {
-            "type": "function",
-            "function": {
-                "name": "recommend_songs",
-                "description": "Recommend similar tracks given resolved seed track IDs.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "track_ids": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "Resolved track IDs to seed the recommender.",
-                        },
-                        "top_n": {"type": "integer", "default": 10, "minimum": 1, "maximum": 50},
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "recommend_songs",
+            "description": "Recommend similar tracks given resolved seed track IDs.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "track_ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Resolved track IDs to seed the recommender.",
                     },
-                    "required": ["track_ids"],
+                    "top_n": {"type": "integer", "default": 10, "minimum": 1, "maximum": 50},
                 },
+                "required": ["track_ids"],
             },
         },
-    ]
+    },
+]
+
+
+def _tool_specs():
+    return _TOOL_SPECS
+
+
+def _run_tool_call(tc: Dict, tool_handlers: Dict[str, Callable[[Dict], Dict]]) -> Dict:
+    """Parse one tool call's arguments and run its handler, capturing errors."""
+    name = tc["function"]["name"]
+    try:
+        args = json.loads(tc["function"]["arguments"] or "{}")
+    except json.JSONDecodeError:
+        args = {}
+    handler = tool_handlers.get(name)
+    if handler is None:
+        return {"error": f"No handler for tool {name}"}
+    try:
+        return handler(args) or {}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _stream_completion(
+    client: OpenAI,
+    on_delta: Optional[Callable[[str], None]] = None,
+    on_round_start: Optional[Callable[[], None]] = None,
+    **kwargs,
+):
+    """Stream a chat completion. Returns (content, tool_calls).
+
+    `on_round_start` is called before the request is sent. Content deltas are
+    forwarded to `on_delta` as they arrive; tool call fragments are
+    accumulated by index into plain message dicts.
+    """
+    if on_round_start is not None:
+        on_round_start()
+    parts: List[str] = []
+    calls: Dict[int, Dict] = {}
+    for chunk in client.chat.completions.create(stream=True, **kwargs):
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            parts.append(delta.content)
+            if on_delta is not None:
+                on_delta(delta.content)
+        for tcd in delta.tool_calls or []:
+            tc = calls.setdefault(tcd.index, {
+                "id": "", "type": "function", "function": {"name": "", "arguments": ""},
+            })
+            if tcd.id:
+                tc["id"] = tcd.id
+            if tcd.function is not None:
+                tc["function"]["name"] += tcd.function.name or ""
+                tc["function"]["arguments"] += tcd.function.arguments or ""
+    return "".join(parts), [calls[i] for i in sorted(calls)]
 
 
 def chat_with_tools(
@@ -79,64 +137,64 @@ def chat_with_tools(
     tool_handlers: Dict[str, Callable[[Dict], Dict]],
     model: str = "gpt-4o-mini",
     max_tool_rounds: int = 3,
+    on_delta: Optional[Callable[[str], None]] = None,
+    on_round_start: Optional[Callable[[], None]] = None,
 ):
-    """Run a chat with tool-calling. Returns (assistant_text, tool_outputs).
+    """Run a streamed chat with tool-calling. Returns (assistant_text, tool_outputs).
 
     tool_handlers: mapping function_name -> callable(args_dict) -> result_dict
+    on_delta: optional callable receiving assistant text fragments as they stream
+    on_round_start: optional callable run before each completion, e.g. to reset
+        a streaming display so text from tool rounds isn't merged into the reply
     """
     client = get_openai_client()
     tool_outputs: Dict[str, Dict] = {}
 
     running_messages = list(messages)
     for _ in range(max_tool_rounds):
-        resp = client.chat.completions.create(
+        content, tool_calls = _stream_completion(
+            client,
+            on_delta,
+            on_round_start,
             model=model,
             messages=running_messages,
             tools=_tool_specs(),
             temperature=0.4,
         )
-        message = resp.choices[0].message
-        tool_calls = getattr(message, "tool_calls", None)
 
         if not tool_calls:
             # Final assistant message
-            content = message.content or ""
             return content, tool_outputs
 
         # Append the assistant message that requested tools
-        running_messages.append({"role": "assistant", "content": message.content or "", "tool_calls": [
-            {"id": tc.id, "type": tc.type, "function": {"name": tc.function.name, "arguments": tc.function.arguments}} for tc in tool_calls
-        ]})
-
-        # Execute tool calls and append tool results
-        for tc in tool_calls:
-            name = tc.function.name
-            try:
-                args = json.loads(tc.function.arguments or "{}")
-            except json.JSONDecodeError:
-                args = {}
-            handler = tool_handlers.get(name)
-            if handler is None:
-                result = {"error": f"No handler for tool {name}"}
-            else:
-                try:
-                    result = handler(args) or {}
-                except Exception as e:
-                    result = {"error": str(e)}
+        running_messages.append({"role": "assistant", "content": content, "tool_calls": tool_calls})
+
+        # Execute tool calls concurrently, then append results in call order
+        if len(tool_calls) == 1:
+            results = [_run_tool_call(tool_calls[0], tool_handlers)]
+        else:
+            with ThreadPoolExecutor(max_workers=len(tool_calls)) as pool:
+                results = list(pool.map(lambda tc: _run_tool_call(tc, tool_handlers), tool_calls))
+
+        for tc, result in zip(tool_calls, results):
+            name = tc["function"]["name"]
             tool_outputs[name] = result
             running_messages.append({
                 "role": "tool",
-                "tool_call_id": tc.id,
+                "tool_call_id": tc["id"],
                 "name": name,
                 "content": json.dumps(result),
             })
 
     # Safety: if we exit due to max rounds, ask the model to finalize
-    final = client.chat.completions.create(
+    content, _ = _stream_completion(
+        client,
+        on_delta,
+        on_round_start,
         model=model,
         messages=running_messages,
         temperature=0.4,
     )
-    return final.choices[0].message.content or "", tool_outputs
+    return content, tool_outputs
 
 
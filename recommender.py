@@ -1,10 +1,9 @@
+import functools
 import os
-from typing import List, Dict, Tuple
+from typing import List, Dict, FrozenSet, Tuple
 
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
 
 
 FEATURE_COLS: List[str] = [
@@ -16,43 +15,86 @@ FEATURE_COLS: List[str] = [
     "loudness",
 ]
 
+DISPLAY_COLS: List[str] = ["track_id", "track_name", "track_artist"]
+
+RECOMMEND_CACHE_SIZE: int = 256
+
 
 class Recommender:
     """Content-based recommender using standardized audio features.
 
     - Loads `spotify_songs.csv`
-    - Standardizes 6 numeric features with a shared `StandardScaler`
+    - Standardizes 6 numeric features to zero mean and unit variance
     - Uses cosine similarity in standardized feature space
+
+    Features live only in the float32 matrices (`X_all` standardized, `X_norm`
+    row-normalized), aligned by row with `df`; `df` keeps display columns only.
     """
 
     def __init__(self, csv_path: str = "spotify_songs.csv") -> None:
         if not os.path.exists(csv_path):
             raise FileNotFoundError(f"CSV not found at {csv_path}")
 
-        self.df: pd.DataFrame = pd.read_csv(csv_path)
+        # Parse only the columns we use, with features straight to float32
+        keep_cols = DISPLAY_COLS + FEATURE_COLS
+        self.df: pd.DataFrame = pd.read_csv(
+            csv_path,
+            usecols=lambda c: c in keep_cols,
+            dtype={c: np.float32 for c in FEATURE_COLS},
+        )
         missing = [c for c in FEATURE_COLS if c not in self.df.columns]
         if missing:
             raise ValueError(f"Missing expected feature columns: {missing}")
 
-        # Keep minimal columns for downstream display
-        keep_cols = ["track_id", "track_name", "track_artist"] + FEATURE_COLS
-        self.df = self.df[keep_cols].copy()
-
-        # Standardize features
-        self.scaler = StandardScaler()
-        self.X_all: np.ndarray = self.scaler.fit_transform(self.df[FEATURE_COLS])
+        # Standardize features: (x - mean) / std, as StandardScaler would
+        raw = self.df[FEATURE_COLS].to_numpy(dtype=np.float32)
+        scale = raw.std(axis=0, dtype=np.float64)
+        scale[scale == 0] = 1.0
+        self._mean: np.ndarray = raw.mean(axis=0, dtype=np.float64).astype(np.float32)
+        self._inv_scale: np.ndarray = (1.0 / scale).astype(np.float32)
+        self.X_all: np.ndarray = (raw - self._mean) * self._inv_scale
+
+        # Pre-normalize rows once so a query is a single matrix-vector product
+        norms = np.linalg.norm(self.X_all, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.X_norm: np.ndarray = np.ascontiguousarray(self.X_all / norms, dtype=np.float32)
+
+        # Features are no longer needed in the frame
+        self.df = self.df[DISPLAY_COLS].reset_index(drop=True)
+
+        # Display columns as plain arrays for cheap per-result lookups
+        self._tid: np.ndarray = self.df["track_id"].to_numpy()
+        self._name: np.ndarray = self.df["track_name"].to_numpy()
+        self._artist: np.ndarray = self.df["track_artist"].to_numpy()
+
+        # track_id -> row positions (a track can appear under several playlists)
+        self._tid_to_rows: Dict[str, np.ndarray] = self.df.groupby(
+            "track_id", sort=False
+        ).indices
+
+        # Results are deterministic in (seed set, top_n); the matrices above are
+        # never replaced, so the cache needs no invalidation
+        self._recommend_cached = functools.lru_cache(maxsize=RECOMMEND_CACHE_SIZE)(
+            self._recommend
+        )
+
+    def _rows_for_track_ids(self, track_ids: List[str]) -> np.ndarray:
+        rows = [self._tid_to_rows[t] for t in set(track_ids) if t in self._tid_to_rows]
+        if not rows:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(rows))
 
     def get_features_for_track_ids(self, track_ids: List[str]) -> np.ndarray:
-        seed_df = self.df[self.df["track_id"].isin(track_ids)]
-        if seed_df.empty:
+        rows = self._rows_for_track_ids(track_ids)
+        if rows.size == 0:
             return np.empty((0, len(FEATURE_COLS)))
-        return self.scaler.transform(seed_df[FEATURE_COLS].values)
+        return self.X_all[rows]
 
     def make_taste_vector(self, track_ids: List[str]) -> np.ndarray:
-        features = self.get_features_for_track_ids(track_ids)
-        if features.size == 0:
+        rows = self._rows_for_track_ids(track_ids)
+        if rows.size == 0:
             return np.empty((0, len(FEATURE_COLS)))
-        return np.mean(features, axis=0, keepdims=True)
+        return self.X_all[rows].mean(axis=0, keepdims=True)
 
     def recommend_by_track_ids(
         self,
@@ -63,34 +105,42 @@ class Recommender:
 
         - Uses cosine similarity in standardized feature space (no training)
         - Excludes seed tracks from results
+        - Memoized per seed set and `top_n`; callers get fresh dicts each time
         """
+        # Ids come from LLM-generated JSON; stringify so odd types just fail to match
+        cached = self._recommend_cached(frozenset(map(str, example_track_ids)), top_n)
+        return [dict(r) for r in cached]
 
-        taste_vector = self.make_taste_vector(example_track_ids)
-        if taste_vector.size == 0:
-            return []
-
-        sims = cosine_similarity(taste_vector, self.X_all).ravel()
-
-        seed_set = set(example_track_ids)
-        indexed = [
-            (idx, score)
-            for idx, score in enumerate(sims)
-            if self.df.iloc[idx]["track_id"] not in seed_set
-        ]
-        indexed.sort(key=lambda x: x[1], reverse=True)
-        top = indexed[:top_n]
-
-        results: List[Dict[str, object]] = []
-        for idx, score in top:
-            row = self.df.iloc[idx]
-            results.append(
-                {
-                    "track_id": row["track_id"],
-                    "track_name": row["track_name"],
-                    "track_artist": row["track_artist"],
-                    "similarity": float(score),
-                }
-            )
-        return results
-
-
+    def _recommend(
+        self,
+        example_track_ids: FrozenSet[str],
+        top_n: int,
+    ) -> Tuple[Dict[str, object], ...]:
+        # Seed rows are resolved once: they build the taste vector and are
+        # masked out of the ranking by index
+        seed_rows = self._rows_for_track_ids(example_track_ids)
+        if seed_rows.size == 0:
+            return ()
+
+        taste = self.X_all[seed_rows].mean(axis=0)
+        taste /= np.linalg.norm(taste) or 1.0
+        available = self.X_norm.shape[0] - seed_rows.size
+        k = min(top_n, available)
+        if k <= 0:
+            return ()
+
+        sims = self.X_norm @ taste
+        sims[seed_rows] = -np.inf
+
+        cand = np.argpartition(-sims, k - 1)[:k]
+        cand = cand[np.lexsort((cand, -sims[cand]))]
+
+        # Convert each column slice to Python objects in one C-level pass
+        tids = self._tid[cand].tolist()
+        names = self._name[cand].tolist()
+        artists = self._artist[cand].tolist()
+        scores = sims[cand].tolist()
+        return tuple(
+            {"track_id": t, "track_name": n, "track_artist": a, "similarity": sc}
+            for t, n, a, sc in zip(tids, names, artists, scores)
+        )
@@ -1,52 +1,105 @@
-from typing import List, Tuple, Dict
+from typing import List, Dict
 
+import numpy as np
 import pandas as pd
 from rapidfuzz import fuzz, process
 
 
-def build_search_index(df: pd.DataFrame) -> List[Tuple[str, str, str]]:
-    """Create a simple index of (display, track_id, key) for fuzzy search.
+class SearchIndex:
+    """Precomputed candidates for fuzzy track search.
 
-    `display` is what we match against, combining track name and artist.
-    `key` is the same string used as the lookup key in fuzzy matching.
+    - `displays`: "name - artist" strings shown to the user
+    - `displays_lower`: lowercased `displays`, what queries are matched against
+    - `track_ids`: track ID for each display, aligned by position
     """
-    records: List[Tuple[str, str, str]] = []
-    for _, row in df.iterrows():
-        name = str(row.get("track_name", "")).strip()
-        artist = str(row.get("track_artist", "")).strip()
-        display = f"{name} - {artist}" if artist else name
-        records.append((display, str(row.get("track_id", "")), display))
-    return records
+
+    def __init__(self, displays: List[str], track_ids: np.ndarray) -> None:
+        self.displays = displays
+        self.displays_lower = [d.lower() for d in displays]
+        self.track_ids = track_ids
+
+
+def build_search_index(df: pd.DataFrame) -> SearchIndex:
+    """Create a search index over "track name - artist" display strings."""
+    names = df["track_name"].fillna("").astype(str).str.strip()
+    artists = df["track_artist"].fillna("").astype(str).str.strip()
+    displays = np.where(artists.ne(""), names + " - " + artists, names).tolist()
+    track_ids = df["track_id"].astype(str).to_numpy()
+    return SearchIndex(displays, track_ids)
 
 
 def fuzzy_find_track_ids(
     user_query: str,
-    index: List[Tuple[str, str, str]],
+    index: SearchIndex,
     limit: int = 5,
     score_cutoff: int = 70,
 ) -> List[Dict[str, str]]:
-    """Fuzzy match user text to candidate tracks.
+    """Fuzzy match user text to candidate tracks (case-insensitive).
 
     Returns a list of {display, track_id, score} sorted by score desc.
     """
-    # candidates is list of display strings
-    candidates = [rec[0] for rec in index]
     matches = process.extract(
-        user_query,
-        candidates,
+        user_query.lower(),
+        index.displays_lower,
         scorer=fuzz.WRatio,
+        processor=None,
         limit=limit,
         score_cutoff=score_cutoff,
     )
 
-    display_to_track = {display: track_id for display, track_id, _ in index}
     results: List[Dict[str, str]] = []
-    for display, score, _idx in matches:
+    for _display, score, idx in matches:
         results.append({
-            "display": display,
-            "track_id": display_to_track.get(display, ""),
+            "display": index.displays[idx],
+            "track_id": str(index.track_ids[idx]),
             "score": score,
         })
     return results
 
 
+def fuzzy_find_track_ids_batch(
+    user_queries: List[str],
+    index: SearchIndex,
+    limit: int = 5,
+    score_cutoff: int = 70,
+) -> List[List[Dict[str, str]]]:
+    """Fuzzy match several song phrases in one batched scan (case-insensitive).
+
+    Scores every query against every candidate with `token_set_ratio` via
+    `process.cdist`. Returns one {display, track_id, score} list per query,
+    each sorted by score desc.
+    """
+    if not user_queries:
+        return []
+
+    queries = [q.lower() for q in user_queries]
+    scores = process.cdist(
+        queries,
+        index.displays_lower,
+        scorer=fuzz.token_set_ratio,
+        processor=None,
+        score_cutoff=score_cutoff,
+        dtype=np.float64,
+        workers=-1,
+    )
+
+    k = min(limit, scores.shape[1])
+    all_results: List[List[Dict[str, str]]] = []
+    for query, row in zip(queries, scores):
+        results: List[Dict[str, str]] = []
+        if k > 0:
+            # token_set_ratio gives many exact ties (query tokens being a subset
+            # of the candidate's), so keep every candidate tied with the k-th
+            # best and break ties with plain `ratio` rather than row order
+            kth = row[np.argpartition(-row, k - 1)[k - 1]]
+            pool = np.flatnonzero(row >= max(kth, score_cutoff))
+            tie_break = np.array([fuzz.ratio(query, index.displays_lower[i]) for i in pool])
+            cand = pool[np.lexsort((pool, -tie_break, -row[pool]))][:k]
+            for idx in cand:
+                results.append({
+                    "display": index.displays[idx],
+                    "track_id": str(index.track_ids[idx]),
+                    "score": float(row[idx]),
+                })
+        all_results.append(results)
+    return all_results
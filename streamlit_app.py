@@ -1,10 +1,11 @@
 import os
+import re
 from typing import List
 
 import streamlit as st
 
 from recommender import Recommender
-from search_utils import build_search_index, fuzzy_find_track_ids
+from search_utils import SearchIndex, build_search_index, fuzzy_find_track_ids_batch
 from llm_utils import call_llm, SYSTEM_PROMPT, chat_with_tools
 
 
@@ -13,10 +14,10 @@ def get_recommender() -> Recommender:
     return Recommender("spotify_songs.csv")
 
 
-@st.cache_data(show_spinner=False)
-def get_search_index():
-    rec = get_recommender()
-    return build_search_index(rec.df)
+@st.cache_resource(show_spinner=False)
+def get_search_index() -> SearchIndex:
+    # Shared by reference, not pickled per session like st.cache_data
+    return build_search_index(get_recommender().df)
 
 
 def main():
@@ -61,7 +62,14 @@ def main():
             query = str(args.get("query", ""))
             limit = int(args.get("limit", 5))
             cutoff = int(args.get("score_cutoff", 70))
-            results = fuzzy_find_track_ids(query, index, limit=limit, score_cutoff=cutoff)
+            # "A by X; B by Y" -> one batched scan over all phrases
+            phrases = [p.strip() for p in re.split(r"[;\n]", query) if p.strip()]
+            batches = fuzzy_find_track_ids_batch(phrases, index, limit=limit, score_cutoff=cutoff)
+            results = [
+                {"query": phrase, **match}
+                for phrase, matches in zip(phrases, batches)
+                for match in matches
+            ]
             return {"matches": results}
 
         def handle_recommend(args):
@@ -72,8 +80,27 @@ def main():
 
         handlers = {"search_tracks": handle_search, "recommend_songs": handle_recommend}
 
+        # Render the assistant reply as it streams in
+        reply_box = st.empty()
+        streamed: List[str] = []
+
+        def on_round_start():
+            # Each completion streams afresh; only the last one is the reply
+            streamed.clear()
+            reply_box.empty()
+
+        def on_delta(text):
+            streamed.append(text)
+            reply_box.markdown(f"**Assistant**: {''.join(streamed)}")
+
         with st.spinner("Thinking with tools..."):
-            assistant_reply, tool_outputs = chat_with_tools(st.session_state.messages, handlers)
+            assistant_reply, tool_outputs = chat_with_tools(
+                st.session_state.messages,
+                handlers,
+                on_delta=on_delta,
+                on_round_start=on_round_start,
+            )
+        reply_box.markdown(f"**Assistant**: {assistant_reply}")
         st.session_state.messages.append({"role": "assistant", "content": assistant_reply})
 
         # If the tool flow produced recommendations, render them